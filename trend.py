@@ -1,6 +1,342 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from numba import njit, prange
+
+_F_TYPE_CODES = {'Type 1': 0, 'Type 2': 1}
+
+# Range scales resolved to integer codes once per run in rng_size, unknown scales fall back to 'Absolute'
+_SCALE_CODES = {'Pips': 0, 'Points': 1, '% of Price': 2, 'ATR': 3, 'Average Change': 4,
+                'Standard Deviation': 5, 'Ticks': 6, 'Absolute': 7}
+
+# Price units of the constant range scales, the range size is rng_qty times the unit on every bar
+_SCALE_UNITS = {
+    0: 0.0001,  # Pips
+    1: 1,  # Points, adjust as per instrument
+    6: 0.01,  # Ticks (mintick), adjust as per instrument
+    7: 1,  # Absolute
+}
+
+# Colors for the filter line and bars, indexed by the uint8 color codes from _filter_into
+_PALETTE = np.array([
+    'gray',
+    '#05ff9b',  # Bright green
+    '#00b36b',  # Darker green
+    '#ff0583',  # Bright red
+    '#b8005d',  # Darker red
+], dtype=object)
+
+
+@njit(cache=True)
+def _pairwise_block(a, lo, n):
+    """
+    Sum a[lo:lo + n] for n <= 128, a leaf of numpy's pairwise summation.
+    """
+    if n < 8:
+        res = -0.0
+        for i in range(n):
+            res += a[lo + i]
+        return res
+
+    # Eight interleaved partial sums, combined as a tree
+    r0 = a[lo]
+    r1 = a[lo + 1]
+    r2 = a[lo + 2]
+    r3 = a[lo + 3]
+    r4 = a[lo + 4]
+    r5 = a[lo + 5]
+    r6 = a[lo + 6]
+    r7 = a[lo + 7]
+    i = 8
+    while i < n - (n % 8):
+        r0 += a[lo + i]
+        r1 += a[lo + i + 1]
+        r2 += a[lo + i + 2]
+        r3 += a[lo + i + 3]
+        r4 += a[lo + i + 4]
+        r5 += a[lo + i + 5]
+        r6 += a[lo + i + 6]
+        r7 += a[lo + i + 7]
+        i += 8
+    res = ((r0 + r1) + (r2 + r3)) + ((r4 + r5) + (r6 + r7))
+    while i < n:
+        res += a[lo + i]
+        i += 1
+    return res
+
+
+@njit(cache=True)
+def _pairwise_sum(a, lo, n):
+    """
+    Sum a[lo:lo + n] in exactly the order numpy's add.reduce uses for a contiguous float64 array.
+
+    Reproducing numpy's pairwise summation keeps compiled means bit-identical to np.mean, which
+    matters because the filter compares consecutive values for equality.
+
+    Parameters:
+    - a: 1-D float64 array
+    - lo: Index of the first value to sum
+    - n: Number of values to sum
+
+    Returns:
+    - Sum of the values
+    """
+    if n <= 128:
+        return _pairwise_block(a, lo, n)
+
+    # Blocks above 128 values are split in two halves, the first a multiple of eight long, and
+    # the half sums added. The split tree is walked with an explicit stack because cached Numba
+    # functions cannot be recursive. A task with n == -1 adds the two most recent sums.
+    task_lo = np.empty(192, dtype=np.int64)
+    task_n = np.empty(192, dtype=np.int64)
+    sums = np.empty(64)
+    n_tasks = 1
+    n_sums = 0
+    task_lo[0] = lo
+    task_n[0] = n
+    while n_tasks > 0:
+        n_tasks -= 1
+        t_lo = task_lo[n_tasks]
+        t_n = task_n[n_tasks]
+        if t_n == -1:
+            n_sums -= 1
+            sums[n_sums - 1] = sums[n_sums - 1] + sums[n_sums]
+        elif t_n <= 128:
+            sums[n_sums] = _pairwise_block(a, t_lo, t_n)
+            n_sums += 1
+        else:
+            n2 = t_n // 2
+            n2 -= n2 % 8
+            # Pushed in reverse, so the first half is summed first
+            task_n[n_tasks] = -1
+            task_lo[n_tasks + 1] = t_lo + n2
+            task_n[n_tasks + 1] = t_n - n2
+            task_lo[n_tasks + 2] = t_lo
+            task_n[n_tasks + 2] = n2
+            n_tasks += 3
+    return sums[0]
+
+
+@njit(cache=True)
+def _ema(x, k):
+    """
+    Exponential Moving Average of x with smoothing factor k.
+
+    Uses the update ema = (x - prev_ema) * k + prev_ema, seeded with the first value and
+    re-seeded after a NaN. pandas' ewm(adjust=False) computes a weighted average instead, which
+    differs in the last bits and can change the Type 2 step count.
+
+    Parameters:
+    - x: 1-D float64 array of values
+    - k: Smoothing factor, 2 / (n + 1) for an n-period EMA
+
+    Returns:
+    - Array of EMA values
+    """
+    out = np.empty(len(x))
+    prev_ema = np.nan
+    for i in range(len(x)):
+        if np.isnan(prev_ema):
+            prev_ema = x[i]
+        else:
+            prev_ema = (x[i] - prev_ema) * k + prev_ema
+        out[i] = prev_ema
+    return out
+
+
+@njit(cache=True)
+def _rolling_std(x, n):
+    """
+    Population standard deviation over the last n values (fewer during warm-up) for every bar.
+
+    Each window is done in two passes, mean first and then squared deviations, both summed in
+    numpy's order. The result is bit-identical to np.mean((w - np.mean(w)) ** 2) ** 0.5 per
+    window w. This matters because the Type 2 step count np.floor(distance / range) often lands
+    exactly on an integer, so a single-ulp difference in the range changes the filter path.
+    Online updates, including pandas' rolling().std(), are not used for that reason. That costs
+    O(n) per bar instead of O(1).
+
+    Parameters:
+    - x: 1-D float64 array of values
+    - n: Window length
+
+    Returns:
+    - Array of standard deviations, NaN for every bar if n < 1
+    """
+    m = len(x)
+    out = np.empty(m)
+    dev = np.empty(max(n, 1))
+    for i in range(m):
+        k = min(i + 1, n)
+        if k < 1:
+            out[i] = np.nan
+            continue
+        lo = i - k + 1
+        mean = _pairwise_sum(x, lo, k) / k
+        for j in range(k):
+            d = x[lo + j] - mean
+            dev[j] = d * d
+        out[i] = np.sqrt(_pairwise_sum(dev, 0, k) / k)
+    return out
+
+
+@njit(cache=True, error_model='numpy')
+def _filter_into(ohlc, r, wicks, f_type_code, av_rf, av_n,
+                 filt, h_band, l_band, fdir, upward, downward, filt_code, bar_code):
+    """
+    Compiled Range Filter recurrence, writing into preallocated output arrays.
+
+    Parameters:
+    - ohlc: C-contiguous float64 array of shape (n, 3) with the columns high, low, close
+    - r: Range size for every bar (already smoothed if required)
+    - wicks: Boolean to use high/low (True) or close (False) as the movement source
+    - f_type_code: 0 for 'Type 1', 1 for 'Type 2'
+    - av_rf: Boolean to decide if filter values should be averaged over filter changes
+    - av_n: Number of filter changes to average when av_rf is True
+    - filt: Output for the filtered price values
+    - h_band: Output for the high band values
+    - l_band: Output for the low band values
+    - fdir: Output for the filter direction (-1, 0 or 1)
+    - upward: Output for the upward trend indicator
+    - downward: Output for the downward trend indicator
+    - filt_code: Output for the filter line color codes (indices into _PALETTE)
+    - bar_code: Output for the bar color codes (indices into _PALETTE)
+    """
+    n = ohlc.shape[0]
+
+    # Ring buffer of the last av_n filter values for averaging, buf_head is the slot of the oldest
+    # one. window holds them oldest first for summing, buf_mean is their current mean.
+    buf = np.empty(max(av_n, 1))
+    window = np.empty(max(av_n, 1))
+    buf_head = 0
+    buf_count = 0
+    buf_mean = np.nan
+
+    rfilt_prev = np.nan
+    direction = 0
+    for i in range(n):
+        # Determine the movement source (high/low or close), one row holds all three prices
+        if wicks:
+            h = ohlc[i, 0]
+            l = ohlc[i, 1]
+        else:
+            h = ohlc[i, 2]
+            l = h
+        rng = r[i]
+
+        # Initialize filter values
+        if np.isnan(rfilt_prev):
+            rfilt = (h + l) / 2
+        else:
+            rfilt = rfilt_prev
+
+            # Apply the selected filter type. Both candidates are computed up front and picked
+            # with conditional expressions, which compile to selects instead of jumps.
+            if f_type_code == 0:
+                up_val = h - rng
+                dn_val = l + rng
+                rfilt = up_val if up_val > rfilt_prev else (dn_val if dn_val < rfilt_prev else rfilt_prev)
+            elif f_type_code == 1:
+                up_val = rfilt_prev + np.floor(abs(h - rfilt_prev) / rng) * rng
+                dn_val = rfilt_prev - np.floor(abs(l - rfilt_prev) / rng) * rng
+                go_up = h >= rfilt_prev + rng
+                go_dn = l <= rfilt_prev - rng
+                rfilt = up_val if go_up else (dn_val if go_dn else rfilt_prev)
+
+        # Handle averaging over filter changes if required
+        rng_filt_value = rfilt
+        if av_rf:
+            if rfilt != rfilt_prev and av_n > 0:
+                if buf_count == av_n:
+                    # Overwrite the oldest value
+                    buf[buf_head] = rfilt
+                    buf_head = (buf_head + 1) % av_n
+                else:
+                    buf[buf_count] = rfilt
+                    buf_count += 1
+
+                # The mean only moves when the window does. It is summed oldest first in numpy's
+                # order, which keeps it bit-identical to np.mean, so ties between consecutive
+                # values stay exact.
+                for j in range(buf_count):
+                    window[j] = buf[(buf_head + j) % av_n]
+                buf_mean = _pairwise_sum(window, 0, buf_count) / buf_count
+            if buf_count > 0:
+                rng_filt_value = buf_mean
+
+        # Calculate the bands
+        filt[i] = rng_filt_value
+        h_band[i] = rng_filt_value + rng
+        l_band[i] = rng_filt_value - rng
+
+        # Determine the filter direction, an unchanged filter keeps the previous direction
+        if i > 0:
+            if rng_filt_value > filt[i - 1]:
+                direction = 1
+            elif rng_filt_value < filt[i - 1]:
+                direction = -1
+        fdir[i] = direction
+        upward[i] = direction == 1
+        downward[i] = direction == -1
+
+        # Assign color codes based on trend direction
+        close = ohlc[i, 2]
+        close_prev = ohlc[i - 1, 2] if i > 0 else close
+        if direction == 1:
+            filt_code[i] = 1
+            bar_code[i] = (1 if close > close_prev else 2) if close > rng_filt_value else 0
+        elif direction == -1:
+            filt_code[i] = 3
+            bar_code[i] = (3 if close < close_prev else 4) if close < rng_filt_value else 0
+        else:
+            filt_code[i] = 0
+            bar_code[i] = 0
+
+        # Update previous filter value
+        rfilt_prev = rfilt
+
+
+@njit(cache=True, error_model='numpy')
+def _run_filter(ohlc, r, wicks, f_type_code, av_rf, av_n):
+    """
+    Compiled Range Filter recurrence over a single series.
+
+    Parameters are the same as for _filter_into.
+
+    Returns:
+    - filt, h_band, l_band, fdir, upward, downward, filt_code, bar_code arrays as filled by _filter_into
+    """
+    n = ohlc.shape[0]
+    out = (np.empty(n), np.empty(n), np.empty(n), np.empty(n, dtype=np.int8), np.empty(n, dtype=np.int8),
+           np.empty(n, dtype=np.int8), np.empty(n, dtype=np.uint8), np.empty(n, dtype=np.uint8))
+    _filter_into(ohlc, r, wicks, f_type_code, av_rf, av_n, *out)
+    return out
+
+
+@njit(cache=True, parallel=True, error_model='numpy')
+def _run_many(ohlc, r, offsets, wicks, f_type_code, av_rf, av_n,
+              filt, h_band, l_band, fdir, upward, downward, filt_code, bar_code):
+    """
+    Run the Range Filter recurrence over several stacked series in parallel.
+
+    Series k occupies the rows offsets[k]:offsets[k + 1] of every input and output array.
+    The recurrence only runs within a series, so the series are spread over the available cores.
+
+    Parameters:
+    - ohlc: C-contiguous float64 array of shape (n, 3) with the high, low, close rows of all series
+    - r: Range size for every row of all series (already smoothed if required)
+    - offsets: int64 array of len(series) + 1 row offsets, starting at 0 and ending at n
+    - wicks, f_type_code, av_rf, av_n: Same as for _filter_into, shared by all series
+    - filt, h_band, l_band, fdir, upward, downward, filt_code, bar_code: Outputs of length n as
+      for _filter_into, the rows offsets[k]:offsets[k + 1] of each are filled with series k
+    """
+    for k in prange(len(offsets) - 1):
+        a = offsets[k]
+        b = offsets[k + 1]
+        _filter_into(ohlc[a:b], r[a:b], wicks, f_type_code, av_rf, av_n,
+                     filt[a:b], h_band[a:b], l_band[a:b], fdir[a:b], upward[a:b], downward[a:b],
+                     filt_code[a:b], bar_code[a:b])
+
 
 class RangeFilter:
     """
@@ -25,9 +361,8 @@ class RangeFilter:
         - av_vals: Boolean to decide if filter values should be averaged over filter changes
         - av_samples: Number of filter changes to average when av_vals is True
         """
-        # Use the original DataFrame to ensure changes are reflected
+        # The caller's DataFrame is left untouched, run() stores the results on a new one
         self.data = data  # pandas DataFrame with columns ['open', 'high', 'low', 'close']
-        self.data.reset_index(drop=True, inplace=True)  # Reset index in-place if needed
         self.f_type = f_type
         self.mov_src = mov_src
         self.rng_qty = rng_qty
@@ -45,318 +380,176 @@ class RangeFilter:
         self.filt = None  # Filtered price
         self.h_band = None  # High band values
         self.l_band = None  # Low band values
+        self.filt_code = None  # Color codes for the filter line (indices into _PALETTE)
+        self.bar_code = None  # Color codes for the bars (indices into _PALETTE)
         self.filt_color = None  # Colors for the filter line
         self.bar_color = None  # Colors for the bars
         self.external_trend_output = None  # External trend signal
 
-    def Cond_EMA(self, x, cond, n, prev_ema):
+    def rng_size(self, high, low, close, x):
         """
-        Conditional Exponential Moving Average.
+        Calculate the range size for every bar based on the selected scale.
 
-        Updates the EMA value only when the condition is True.
+        ATR and Average Change use an EMA with k = 2 / (n + 1).
 
         Parameters:
-        - x: Current data point
-        - cond: Condition to update the EMA
-        - n: Period for EMA calculation
-        - prev_ema: Previous EMA value
+        - high: High values
+        - low: Low values
+        - close: Close values
+        - x: Mid-price values of the movement source
 
         Returns:
-        - Updated EMA value
-        """
-        k = 2 / (n + 1)
-        if cond:
-            if np.isnan(prev_ema):
-                ema = x
-            else:
-                ema = (x - prev_ema) * k + prev_ema
-        else:
-            ema = prev_ema
-        return ema
-
-    def Cond_SMA(self, x_list):
+        - Array of calculated range sizes
         """
-        Conditional Simple Moving Average.
+        qty = self.rng_qty
+        n = self.rng_per
+        code = _SCALE_CODES.get(self.rng_scale, _SCALE_CODES['Absolute'])
+        alpha = 2 / (n + 1)
 
-        Calculates the average of the values in the list.
+        # Constant scales need no price statistics at all
+        if code in _SCALE_UNITS:
+            return np.full(len(x), qty * _SCALE_UNITS[code], dtype=np.float64)
 
-        Parameters:
-        - x_list: List of data points
+        # Calculate the range size based on the selected scale
+        if code == 2:  # '% of Price'
+            rng_size = close * qty / 100
+        elif code == 3:  # 'ATR'
+            # True Range, the first bar falls back to high - low. The candidates are compared in
+            # the order of Python's max(), which keeps a NaN first candidate but skips later ones.
+            prev_close = np.concatenate((low[:1], close[:-1]))
+            tr = high - low
+            b = np.abs(high - prev_close)
+            tr = np.where(b > tr, b, tr)
+            c = np.abs(low - prev_close)
+            tr = np.where(c > tr, c, tr)
+            rng_size = qty * _ema(tr, alpha)
+        elif code == 4:  # 'Average Change'
+            # Absolute change of the mid-price against the previous bar's high/low midpoint, zero on
+            # the first bar even if its price is missing
+            hl2 = (high + low) / 2
+            ac = np.abs(x - np.concatenate((x[:1], hl2[:-1])))
+            ac[:1] = 0
+            rng_size = qty * _ema(ac, alpha)
+        else:  # 'Standard Deviation'
+            # Rolling population standard deviation of the mid-price
+            sd = _rolling_std(np.ascontiguousarray(x), int(n))
+            rng_size = qty * sd
+
+        return rng_size
+
+    def _prepare(self):
+        """
+        Build the inputs of the compiled filter kernel from the data.
 
         Returns:
-        - SMA value
+        - ohlc: C-contiguous float64 array of shape (n, 3) with the columns high, low, close
+        - r: Range size for every bar, smoothed if required
         """
-        if len(x_list) == 0:
-            return np.nan
-        else:
-            return np.mean(x_list)
+        # Extract the price columns once into a single row-major buffer, the compiled kernel
+        # reads high, low and close of a bar from one row
+        ohlc = np.ascontiguousarray(self.data[['high', 'low', 'close']].to_numpy(dtype=np.float64))
+        high, low, close = ohlc.T
 
-    def Stdev(self, x_list, mean):
-        """
-        Standard Deviation calculation.
+        # Determine the mid-price of the movement source (high/low or close)
+        if self.mov_src == 'Wicks':
+            mid = (high + low) / 2
+        else:  # 'Close'
+            mid = close
 
-        Parameters:
-        - x_list: List of data points
-        - mean: Mean of the data points
+        # Range size for every bar, smoothed with an EMA over smooth_per if required
+        r = self.rng_size(high, low, close, mid)
+        if self.smooth_range:
+            r = _ema(r, 2 / (self.smooth_per + 1))
 
-        Returns:
-        - Standard deviation value
-        """
-        if len(x_list) == 0:
-            return np.nan
-        else:
-            return np.sqrt(np.mean((x_list - mean) ** 2))
+        return ohlc, r
 
-    def rng_size(self, x, i, prev_ac, prev_atr, prev_sd, ac_list, sd_list):
+    def _kernel_params(self):
         """
-        Calculate the range size based on the selected scale.
-
-        Parameters:
-        - x: Current price value
-        - i: Current index
-        - prev_ac: Previous Average Change value
-        - prev_atr: Previous ATR value
-        - prev_sd: Previous Standard Deviation value
-        - ac_list: List to store changes for Average Change calculation
-        - sd_list: List to store values for Standard Deviation calculation
-
-        Returns:
-        - Calculated range size
-        - Updated prev_ac, prev_atr, prev_sd, ac_list, sd_list
+        Scalar parameters of the compiled filter kernel: wicks, f_type_code, av_rf, av_n.
         """
-        qty = self.rng_qty
-        n = self.rng_per
-        scale = self.rng_scale
-
-        # Calculate True Range (TR) for ATR
-        if i == 0:
-            tr = self.data['high'].iloc[i] - self.data['low'].iloc[i]
-        else:
-            tr = max(
-                self.data['high'].iloc[i] - self.data['low'].iloc[i],
-                abs(self.data['high'].iloc[i] - self.data['close'].iloc[i - 1]),
-                abs(self.data['low'].iloc[i] - self.data['close'].iloc[i - 1])
-            )
-
-        # Update ATR using Conditional EMA
-        prev_atr = self.Cond_EMA(tr, True, n, prev_atr)
-
-        # Calculate Absolute Change (AC) for Average Change
-        if i == 0:
-            ac = 0
-        else:
-            ac = abs(x - ((self.data['high'].iloc[i - 1] + self.data['low'].iloc[i - 1]) / 2))
-
-        # Update AC using Conditional EMA
-        prev_ac = self.Cond_EMA(ac, True, n, prev_ac)
+        return self.mov_src == 'Wicks', _F_TYPE_CODES.get(self.f_type, -1), self.av_vals, self.av_samples
 
-        # Update lists for Standard Deviation
-        sd_list.append(x)
-        if len(sd_list) > n:
-            sd_list.pop(0)
-        mean_sd = self.Cond_SMA(sd_list)
-        prev_sd = self.Stdev(sd_list, mean_sd)
-
-        # Calculate the range size based on the selected scale
-        if scale == 'Pips':
-            rng_size = qty * 0.0001
-        elif scale == 'Points':
-            pointvalue = 1  # Adjust as per instrument
-            rng_size = qty * pointvalue
-        elif scale == '% of Price':
-            rng_size = self.data['close'].iloc[i] * qty / 100
-        elif scale == 'ATR':
-            rng_size = qty * prev_atr if prev_atr is not None else 0
-        elif scale == 'Average Change':
-            rng_size = qty * prev_ac if prev_ac is not None else 0
-        elif scale == 'Standard Deviation':
-            rng_size = qty * prev_sd if prev_sd is not None else 0
-        elif scale == 'Ticks':
-            mintick = 0.01  # Adjust as per instrument
-            rng_size = qty * mintick
-        else:  # 'Absolute'
-            rng_size = qty
-
-        return rng_size, prev_ac, prev_atr, prev_sd, ac_list, sd_list
-
-    def rng_filt(self, h, l, rng_size_value, i, rfilt_prev, prev_rng_smooth, filt_change_count, filt_change_values):
+    def _store(self, filt, h_band, l_band, fdir, upward, downward, filt_code, bar_code):
         """
-        Calculate the Range Filter values.
-
-        Parameters:
-        - h: High value for the current bar
-        - l: Low value for the current bar
-        - rng_size_value: Calculated range size
-        - i: Current index
-        - rfilt_prev: Previous filter value
-        - prev_rng_smooth: Previous smoothed range value
-        - filt_change_count: Counter for filter changes
-        - filt_change_values: List to store filter values for averaging
-
-        Returns:
-        - hi_band: High band value
-        - lo_band: Low band value
-        - rng_filt_value: Filtered price value
-        - Updated rfilt_prev, prev_rng_smooth, filt_change_count, filt_change_values
+        Store the kernel outputs and attach them to a re-indexed copy of the data.
         """
-        n = self.rng_per
-        f_type = self.f_type
-        smooth = self.smooth_range
-        sn = self.smooth_per
-        av_rf = self.av_vals
-        av_n = self.av_samples
+        self.filt = filt
+        self.h_band = h_band
+        self.l_band = l_band
+        self.fdir = fdir
+        self.upward = upward
+        self.downward = downward
+        self.filt_code = filt_code
+        self.bar_code = bar_code
+
+        # External trend output (-1 for bearish, 1 for bullish)
+        self.external_trend_output = self.fdir.copy()
+
+        # Map the codes to colors lazily, a categorical keeps one byte per bar
+        self.filt_color = pd.Categorical.from_codes(self.filt_code, categories=_PALETTE)
+        self.bar_color = pd.Categorical.from_codes(self.bar_code, categories=_PALETTE)
+
+        # Build the results as one frame and join it to a re-indexed copy of the data in a single
+        # concat, results of an earlier run are replaced
+        results = pd.DataFrame({
+            'filt': self.filt,
+            'h_band': self.h_band,
+            'l_band': self.l_band,
+            'fdir': self.fdir,
+            'upward': self.upward,
+            'downward': self.downward,
+            'filt_color': self.filt_color,
+            'bar_color': self.bar_color,
+            'external_trend_output': self.external_trend_output,
+        })
+        data = self.data.reset_index(drop=True).drop(columns=results.columns, errors='ignore')
+        self.data = pd.concat([data, results], axis=1)
 
-        # Smooth the range size if required
-        prev_rng_smooth = self.Cond_EMA(rng_size_value, True, sn, prev_rng_smooth)
-        r = prev_rng_smooth if smooth else rng_size_value
-
-        # Initialize filter values
-        if np.isnan(rfilt_prev):
-            rfilt = (h + l) / 2
-        else:
-            rfilt = rfilt_prev
-
-            # Apply the selected filter type
-            if f_type == 'Type 1':
-                if h - r > rfilt_prev:
-                    rfilt = h - r
-                elif l + r < rfilt_prev:
-                    rfilt = l + r
-            elif f_type == 'Type 2':
-                if h >= rfilt_prev + r:
-                    rfilt = rfilt_prev + np.floor(abs(h - rfilt_prev) / r) * r
-                elif l <= rfilt_prev - r:
-                    rfilt = rfilt_prev - np.floor(abs(l - rfilt_prev) / r) * r
+    def run(self):
+        """
+        Execute the Range Filter calculations on the provided data.
+        """
+        ohlc, r = self._prepare()
 
-        # Calculate the bands
-        hi_band = rfilt + r
-        lo_band = rfilt - r
+        # Calculate the filter, bands, trend direction and color codes in one compiled pass
+        self._store(*_run_filter(ohlc, r, *self._kernel_params()))
 
-        # Handle averaging over filter changes if required
-        if av_rf:
-            filt_changed = rfilt != rfilt_prev
-            if filt_changed:
-                filt_change_values.append(rfilt)
-                if len(filt_change_values) > av_n:
-                    filt_change_values.pop(0)
-                filt_change_count += 1
-            rng_filt_value = np.mean(filt_change_values) if filt_change_values else rfilt
-            hi_band = rng_filt_value + r
-            lo_band = rng_filt_value - r
-        else:
-            rng_filt_value = rfilt
+    @classmethod
+    def run_batch(cls, datas, **params):
+        """
+        Execute the Range Filter on several independent series, e.g. one per instrument.
 
-        # Update previous filter value
-        rfilt_prev = rfilt
+        All series share the same parameters. They are stacked into one buffer and the
+        compiled filter runs over them in parallel, one series per core.
 
-        return hi_band, lo_band, rng_filt_value, rfilt_prev, prev_rng_smooth, filt_change_count, filt_change_values
+        Parameters:
+        - datas: List of pandas DataFrames with columns ['open', 'high', 'low', 'close']
+        - params: Keyword arguments passed to RangeFilter for every series
 
-    def run(self):
-        """
-        Execute the Range Filter calculations on the provided data.
+        Returns:
+        - List of RangeFilter instances that have been run, in the order of datas
         """
-        # Initialize variables and lists for calculations
-        data = self.data
-        n = len(data)
-        self.filt = np.zeros(n)
-        self.h_band = np.zeros(n)
-        self.l_band = np.zeros(n)
-        self.fdir = np.zeros(n)
-        self.upward = np.zeros(n)
-        self.downward = np.zeros(n)
-        self.filt_color = np.array(['gray'] * n, dtype=object)
-        self.bar_color = np.array(['gray'] * n, dtype=object)
-        self.external_trend_output = np.zeros(n)
-
-        # Variables for Conditional EMA and SMA calculations
-        prev_ac = np.nan  # Previous Average Change EMA
-        prev_atr = np.nan  # Previous ATR EMA
-        prev_sd = np.nan  # Previous Standard Deviation
-        ac_list = []  # List to store changes for Average Change calculation
-        sd_list = []  # List to store values for Standard Deviation calculation
-        prev_rng_smooth = np.nan  # Previous smoothed range value
-        rfilt_prev = np.nan  # Previous filter value
-        filt_change_count = 0  # Counter for filter changes
-        filt_change_values = []  # List to store filter values for averaging
-
-        # Loop over the data to compute the filter
-        for i in range(n):
-            # Determine the movement source (high/low or close)
-            if self.mov_src == 'Wicks':
-                h_val = data['high'].iloc[i]
-                l_val = data['low'].iloc[i]
-            else:  # 'Close'
-                h_val = data['close'].iloc[i]
-                l_val = data['close'].iloc[i]
-
-            # Calculate the mid-price
-            x = (h_val + l_val) / 2
-
-            # Calculate the range size
-            rng_size_value, prev_ac, prev_atr, prev_sd, ac_list, sd_list = self.rng_size(
-                x, i, prev_ac, prev_atr, prev_sd, ac_list, sd_list)
-
-            # Calculate the filter and bands
-            h_band_i, l_band_i, filt_i, rfilt_prev, prev_rng_smooth, filt_change_count, filt_change_values = self.rng_filt(
-                h_val, l_val, rng_size_value, i, rfilt_prev, prev_rng_smooth, filt_change_count, filt_change_values)
-
-            # Store the computed values
-            self.h_band[i] = h_band_i
-            self.l_band[i] = l_band_i
-            self.filt[i] = filt_i
-
-            # Determine the filter direction
-            if i == 0:
-                self.fdir[i] = 0
-            else:
-                if self.filt[i] > self.filt[i - 1]:
-                    self.fdir[i] = 1
-                elif self.filt[i] < self.filt[i - 1]:
-                    self.fdir[i] = -1
-                else:
-                    self.fdir[i] = self.fdir[i - 1]
-
-            # Set upward and downward indicators
-            self.upward[i] = 1 if self.fdir[i] == 1 else 0
-            self.downward[i] = 1 if self.fdir[i] == -1 else 0
-
-            # Assign colors based on trend direction
-            if self.upward[i]:
-                self.filt_color[i] = '#05ff9b'  # Bright green
-                if data['close'].iloc[i] > self.filt[i]:
-                    if i > 0 and data['close'].iloc[i] > data['close'].iloc[i - 1]:
-                        self.bar_color[i] = '#05ff9b'  # Bright green
-                    else:
-                        self.bar_color[i] = '#00b36b'  # Darker green
-                else:
-                    self.bar_color[i] = 'gray'
-            elif self.downward[i]:
-                self.filt_color[i] = '#ff0583'  # Bright red
-                if data['close'].iloc[i] < self.filt[i]:
-                    if i > 0 and data['close'].iloc[i] < data['close'].iloc[i - 1]:
-                        self.bar_color[i] = '#ff0583'  # Bright red
-                    else:
-                        self.bar_color[i] = '#b8005d'  # Darker red
-                else:
-                    self.bar_color[i] = 'gray'
-            else:
-                self.filt_color[i] = 'gray'
-                self.bar_color[i] = 'gray'
-
-            # External trend output (-1 for bearish, 1 for bullish)
-            self.external_trend_output[i] = self.fdir[i]
-
-        # Append the results to the original data DataFrame
-        data['filt'] = self.filt
-        data['h_band'] = self.h_band
-        data['l_band'] = self.l_band
-        data['fdir'] = self.fdir
-        data['upward'] = self.upward
-        data['downward'] = self.downward
-        data['filt_color'] = self.filt_color
-        data['bar_color'] = self.bar_color
-        data['external_trend_output'] = self.external_trend_output
-
-    # Optionally, you can add a method to return the modified DataFrame
+        filters = [cls(data, **params) for data in datas]
+        if not filters:
+            return filters
+
+        inputs = [rf._prepare() for rf in filters]
+        offsets = np.zeros(len(inputs) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ohlc) for ohlc, _ in inputs])
+        ohlc = np.concatenate([ohlc for ohlc, _ in inputs])
+        r = np.concatenate([r for _, r in inputs])
+
+        n = len(ohlc)
+        out = (np.empty(n), np.empty(n), np.empty(n), np.empty(n, dtype=np.int8), np.empty(n, dtype=np.int8),
+               np.empty(n, dtype=np.int8), np.empty(n, dtype=np.uint8), np.empty(n, dtype=np.uint8))
+        _run_many(ohlc, r, offsets, *filters[0]._kernel_params(), *out)
+
+        # Every filter gets copies of its rows, views would keep the stacked buffers of the whole
+        # batch alive for as long as any one result is kept
+        for k, rf in enumerate(filters):
+            rf._store(*(arr[offsets[k]:offsets[k + 1]].copy() for arr in out))
+        return filters
+
+    # Return the DataFrame with the filter results, the caller's DataFrame is not modified
     def get_data(self):
         return self.data